@@ -5,26 +5,31 @@ Voice Call Assistant API
 Ses dosyasını alır -> Whisper ile metne çevirir -> LLM'den yanıt üretir -> (ops.) TTS/placeholder üretir.
 
 Öne çıkanlar
-- UTF-8 JSON: Türkçe karakterler kaçışsız döner.
+- UTF-8 JSON (orjson): Türkçe karakterler kaçışsız döner.
 - Sağlam hata yönetimi: ASR/LLM hataları ayrıştırılır ve net mesajlar/loglar verilir.
 - PEP 8 ve tip ipuçları: Okunabilirlik ve IDE desteği güçlendirildi.
 """
 
 from __future__ import annotations
 
+import atexit
 import logging
 import os
+import queue
 import shutil
+import threading
+import time
 import uuid
-from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Final
+from typing import Any, BinaryIO, Final
 
-import whisper
+import ctranslate2
+import orjson
 from dotenv import load_dotenv
+from faster_whisper import BatchedInferencePipeline, WhisperModel
 from flask import Flask, jsonify, request, send_from_directory
 from flask.json.provider import DefaultJSONProvider
-from werkzeug.utils import secure_filename
 
 
 # =============================================================================
@@ -34,25 +39,78 @@ from werkzeug.utils import secure_filename
 # .env içeriğini (örn. WHISPER_MODEL, LOG_LEVEL) yükle
 load_dotenv()
 
+
+def _resolve_whisper_device() -> str:
+    """
+    WHISPER_DEVICE değişkenini çözer: "auto" → CUDA görünürse "cuda", yoksa "cpu".
+    Not: CTranslate2 MPS desteklemez; Apple cihazlarda CPU (int8) kullanılır.
+    """
+    device = os.getenv("WHISPER_DEVICE", "auto").lower()
+    if device != "auto":
+        return device
+    return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+
 # Uygulama sabitleri (single source of truth)
 MAX_UPLOAD_BYTES: Final[int] = 16 * 1024 * 1024
-UPLOAD_DIR: Final[str] = "uploads"
-RESPONSES_DIR: Final[str] = "responses"
+# Tüm worker'ların paylaştığı klasör; send_from_directory göreli yolu app.root_path'e
+# göre çözdüğü için yazma ve okuma aynı mutlak yolu kullanır
+RESPONSES_DIR: Final[str] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "responses")
+# Yanıt dosyalarının ömrü ve süreç başına en sık budama aralığı (saniye)
+RESPONSE_TTL_SECONDS: Final[int] = int(os.getenv("RESPONSE_TTL_SECONDS", "3600"))
+RESPONSE_PRUNE_INTERVAL_SECONDS: Final[int] = 60
 ALLOWED_EXTENSIONS: Final[set[str]] = {"wav", "mp3", "mp4", "m4a", "flac", "ogg"}
+ALLOWED_SUFFIXES: Final[tuple[str, ...]] = tuple(f".{ext}" for ext in ALLOWED_EXTENSIONS)
 WHISPER_MODEL_NAME: Final[str] = os.getenv("WHISPER_MODEL", "base")
+WHISPER_DEVICE: Final[str] = _resolve_whisper_device()
+# GPU'da float16 (tensor core), CPU'da int8 (VNNI); WHISPER_COMPUTE_TYPE ile ezilebilir
+WHISPER_COMPUTE_TYPE: Final[str] = os.getenv(
+    "WHISPER_COMPUTE_TYPE", "float16" if WHISPER_DEVICE == "cuda" else "int8"
+)
+# Silero VAD: konuşma olmayan bölümler (sessizlik, saf ton, müzik) Whisper'a hiç verilmez.
+# Konuşma içermeyen kayıt boş transkript → "Empty transcription" hatası döner (kasıtlı).
+WHISPER_VAD_FILTER: Final[bool] = os.getenv("WHISPER_VAD_FILTER", "true").lower() == "true"
+# >1: VAD ile bölünen parçalar tek encoder/decoder çağrısında toplu işlenir; 1 veya VAD
+# kapalıyken sıralı model.transcribe kullanılır
+WHISPER_BATCH_SIZE: Final[int] = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+# Eşzamanlı transcribe() çağrısı sayısı (gthread worker'ları için) ve worker başı intra-op thread.
+# Her gunicorn süreci kendi modelini yükler: çekirdekler süreç × Whisper worker'ına bölünür
+# (WEB_CONCURRENCY, gunicorn.conf.py ile aynı varsayılan), yoksa host aşırı abone olur.
+WEB_CONCURRENCY: Final[int] = max(1, int(os.getenv("WEB_CONCURRENCY", "2")))
+WHISPER_NUM_WORKERS: Final[int] = max(1, int(os.getenv("WHISPER_NUM_WORKERS", "2")))
+WHISPER_CPU_THREADS: Final[int] = int(
+    os.getenv(
+        "WHISPER_CPU_THREADS",
+        str(max(1, (os.cpu_count() or 1) // (WEB_CONCURRENCY * WHISPER_NUM_WORKERS))),
+    )
+)
 LOG_LEVEL: Final[str] = os.getenv("LOG_LEVEL", "INFO")
+# PATH taraması bir kez yapılır; /health her çağrıda tekrar etmez
+FFMPEG_PATH: Final[str | None] = shutil.which("ffmpeg")
+# Transkriptin tamamını loglamak (KVKK/PII ve log hacmi nedeniyle varsayılan kapalı)
+LOG_TRANSCRIPTS: Final[bool] = os.getenv("LOG_TRANSCRIPTS", "false").lower() == "true"
 
 
 # =============================================================================
 # Flask Uygulaması ve JSON Sağlayıcı
 # =============================================================================
 
-class UTF8JSONProvider(DefaultJSONProvider):
+class ORJSONProvider(DefaultJSONProvider):
     """
-    Flask'ın varsayılan JSON sağlayıcısını UTF-8 için yapılandırır.
-    ensure_ascii=False ile Türkçe karakterler \u00e7 gibi kaçışsız döner.
+    Flask'ın JSON sağlayıcısını orjson (C) ile değiştirir.
+    orjson her zaman UTF-8 üretir; Türkçe karakterler \u00e7 gibi kaçışsız döner.
     """
-    ensure_ascii = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):  # debug modunda okunabilir çıktı
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
 
 
 def create_app() -> Flask:
@@ -61,34 +119,97 @@ def create_app() -> Flask:
     App factory deseni test ve genişletilebilirlik için faydalıdır.
     """
     app = Flask(__name__)
-    app.json = UTF8JSONProvider(app)  # UTF-8 JSON
+    app.json = ORJSONProvider(app)  # UTF-8 JSON (orjson)
     app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES  # 16MB yük limiti
 
-    # Klasörleri garanti altına al
-    Path(UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
+    # Klasörü garanti altına al
     Path(RESPONSES_DIR).mkdir(parents=True, exist_ok=True)
 
     return app
 
 
+def configure_logging(level: str) -> None:
+    """
+    Kök logger'a QueueHandler bağlar; stderr'e yazma ayrı bir listener thread'inde yapılır.
+    İstek thread'i yalnızca kuyruğa ekler, terminal/pipe yazımını beklemez.
+    basicConfig gibi, kök logger zaten yapılandırılmışsa (gunicorn, pytest) dokunmaz.
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("{levelname}:{name}:{message}", style="{"))
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+    logging.raiseExceptions = False  # log hatası isteği düşürmesin
+    listener.start()
+    atexit.register(listener.stop)  # çıkışta kuyruğu boşalt
+
+
 # Uygulama örneği ve logger
 app = create_app()
-logging.basicConfig(level=LOG_LEVEL)
+configure_logging(LOG_LEVEL)
 logger = logging.getLogger("voice-assistant")
 
 
 # =============================================================================
-# Whisper Modeli (Lazy yükleme yerine burada tek sefer)
+# Whisper Modeli (arka planda lazy yükleme)
 # =============================================================================
+# Model import anında değil, ayrı bir thread'de yüklenir: worker hemen ayağa kalkar,
+# /health anında yanıt verir. İlk transkripsiyon yükleme bitene kadar bekler.
+
+logger.info("FFMPEG PATH: %s", FFMPEG_PATH)
+
+WHISPER_MODEL: WhisperModel | None = None
+WHISPER_PIPELINE: BatchedInferencePipeline | None = None
+_WHISPER_LOAD_LOCK = threading.Lock()
+_WHISPER_LOAD_ATTEMPTED = False
+
+
+def get_whisper_model() -> WhisperModel | None:
+    """
+    Whisper modelini ilk çağrıda (tek sefer, thread-safe) yükler ve döner.
+    Yükleme başarısızsa None döner; tekrar denenmez (eski davranışla aynı).
+    """
+    global WHISPER_MODEL, WHISPER_PIPELINE, _WHISPER_LOAD_ATTEMPTED
+    if _WHISPER_LOAD_ATTEMPTED:
+        return WHISPER_MODEL
+
+    with _WHISPER_LOAD_LOCK:
+        if _WHISPER_LOAD_ATTEMPTED:
+            return WHISPER_MODEL
+        logger.info(
+            "Loading Whisper model: %s (device=%s, compute_type=%s, workers=%d, cpu_threads=%d)",
+            WHISPER_MODEL_NAME, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE,
+            WHISPER_NUM_WORKERS, WHISPER_CPU_THREADS,
+        )
+        try:
+            model = WhisperModel(
+                WHISPER_MODEL_NAME,
+                device=WHISPER_DEVICE,
+                compute_type=WHISPER_COMPUTE_TYPE,
+                cpu_threads=WHISPER_CPU_THREADS,
+                num_workers=WHISPER_NUM_WORKERS,
+            )
+            # Pipeline modelden önce atanır: WHISPER_MODEL görünen herkes pipeline'ı da görür.
+            # Toplu mod parçaları VAD'den alır; VAD kapalıyken ≥30 sn kayıtlarda hata verir.
+            if WHISPER_BATCH_SIZE > 1 and WHISPER_VAD_FILTER:
+                WHISPER_PIPELINE = BatchedInferencePipeline(model)
+            WHISPER_MODEL = model
+            logger.info("Whisper model loaded successfully")
+        except Exception:
+            logger.exception("Failed to load Whisper model")
+        finally:
+            _WHISPER_LOAD_ATTEMPTED = True
+    return WHISPER_MODEL
+
 
-logger.info("FFMPEG PATH: %s", shutil.which("ffmpeg"))
-logger.info("Loading Whisper model: %s", WHISPER_MODEL_NAME)
-try:
-    WHISPER_MODEL = whisper.load_model(WHISPER_MODEL_NAME)
-    logger.info("Whisper model loaded successfully")
-except Exception:
-    logger.exception("Failed to load Whisper model")
-    WHISPER_MODEL = None
+# Isınma: worker başlangıcını bloklamadan modeli arka planda yükle
+threading.Thread(target=get_whisper_model, name="whisper-warmup", daemon=True).start()
 
 
 # =============================================================================
@@ -101,16 +222,38 @@ def is_allowed_file(filename: str) -> bool:
 
     Örn: "audio.mp3" -> True, "archive.zip" -> False
     """
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
 
 
-def transcribe_audio(file_path: str, language: str = "tr") -> str:
+# Eski isim (testler ve dış çağıranlar için)
+allowed_file = is_allowed_file
+
+
+# Konteyner imzaları: WAV, MP3 (ID3 etiketi), FLAC, OGG
+_AUDIO_MAGIC: Final[tuple[bytes, ...]] = (b"RIFF", b"ID3", b"fLaC", b"OggS")
+
+
+def looks_like_audio(head: bytes) -> bool:
+    """
+    Dosyanın ilk 12 baytından desteklenen bir ses konteyneri olup olmadığını tahmin eder.
+    Bozuk/sahte yüklemeleri Whisper'a (ve belleğe) ulaşmadan reddetmek içindir.
+    """
+    if head.startswith(_AUDIO_MAGIC):
+        return True
+    if head[4:8] == b"ftyp":  # MP4/M4A
+        return True
+    # Etiketsiz MP3: 11 bitlik frame sync (0xFFE...)
+    return len(head) >= 2 and head[0] == 0xFF and (head[1] & 0xE0) == 0xE0
+
+
+def transcribe_audio(audio: str | BinaryIO, language: str = "tr") -> str:
     """
-    Whisper ile sesi metne çevirir.
+    Whisper (faster-whisper / CTranslate2) ile sesi metne çevirir.
     Hata durumunda istisna fırlatır; üst seviye handler JSON hata döndürür.
 
     Args:
-        file_path: Diskteki ses dosyasının tam yolu.
+        audio: Ses dosyası yolu veya dosya benzeri nesne (örn. yüklemenin kendi akışı).
+               Dosya benzeri nesneler PyAV ile süreç içinde çözülür (ffmpeg süreci açılmaz).
         language: Dil ipucu. (Otomatik tespit istenirse None/"" verilebilir.)
 
     Returns:
@@ -118,35 +261,89 @@ def transcribe_audio(file_path: str, language: str = "tr") -> str:
 
     Raises:
         RuntimeError: Model yoksa veya sonuç boşsa.
-        Exception: Whisper/ffmpeg kaynaklı diğer hatalar.
+        Exception: Whisper/PyAV kaynaklı diğer hatalar (örn. bozuk ses).
     """
-    if WHISPER_MODEL is None:
+    model = get_whisper_model()
+    if model is None:
         raise RuntimeError("Whisper model not available")
 
-    result = WHISPER_MODEL.transcribe(
-        file_path,
-        language=language or None,  # boş/None -> otomatik dil tespiti
-        fp16=False,                  # CPU ortamlarında güvenli seçenek
-        verbose=False,
-    )
-    text = (result.get("text") or "").strip()
+    # Log-mel ön işleme: mel filtre bankası WhisperModel kurulurken bir kez hesaplanır
+    # (FeatureExtractor), STFT vektörize NumPy ile yapılır; ses de yalnızca bir kez çözülür.
+    options = {
+        "language": language or None,  # boş/None -> otomatik dil tespiti
+        "vad_filter": WHISPER_VAD_FILTER,  # sessiz bölümleri atla
+    }
+    if WHISPER_PIPELINE is not None:
+        # VAD parçaları [B, n_mels, T] olarak tek seferde encoder'dan geçer
+        segments, _ = WHISPER_PIPELINE.transcribe(audio, batch_size=WHISPER_BATCH_SIZE, **options)
+    else:
+        segments, _ = model.transcribe(audio, **options)
+    # segments bir generator'dır; asıl çözümleme burada iterasyonla yapılır
+    text = "".join(seg.text for seg in segments).strip()
     if not text:
         raise RuntimeError("Empty transcription")
     return text
 
 
+_LAST_RESPONSE_PRUNE: float = 0.0
+
+
+def _prune_response_files(now: float) -> None:
+    """
+    RESPONSE_TTL_SECONDS'tan eski response_*.txt dosyalarını siler.
+    Klasör taraması süreç başına en fazla RESPONSE_PRUNE_INTERVAL_SECONDS'ta bir yapılır;
+    iki worker aynı dosyayı silmeye çalışırsa FileNotFoundError yok sayılır.
+    """
+    global _LAST_RESPONSE_PRUNE
+    if now - _LAST_RESPONSE_PRUNE < RESPONSE_PRUNE_INTERVAL_SECONDS:
+        return
+    _LAST_RESPONSE_PRUNE = now
+
+    cutoff = now - RESPONSE_TTL_SECONDS
+    try:
+        with os.scandir(RESPONSES_DIR) as entries:
+            for entry in entries:
+                if not (entry.name.startswith("response_") and entry.name.endswith(".txt")):
+                    continue
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+    except OSError:
+        logger.exception("Failed to prune response files")
+
+
 def save_text_response(text: str) -> str:
     """
     TTS henüz bağlı değilse yanıtı .txt olarak kaydeder ve public URL döner.
+    Dosya diskte tutulur; böylece hangi gunicorn worker'ı GET'i alırsa alsın bulunur.
+    Süresi dolan eski yanıtlar yazım sırasında budanır.
 
     Returns:
         İstemcinin GET ile indirebileceği /responses/<dosya> URL'i.
     """
+    _prune_response_files(time.time())
     path = Path(RESPONSES_DIR) / f"response_{uuid.uuid4().hex}.txt"
     path.write_text(text, encoding="utf-8")
     return f"/responses/{path.name}"
 
 
+# Saniyede en fazla bir kez biçimlenen zaman damgası: (epoch saniyesi, ISO 8601 metin)
+_TIMESTAMP_CACHE: tuple[int, str] = (0, "")
+
+
+def _current_timestamp() -> str:
+    """Yerel saatte ISO 8601 zaman damgası (saniye hassasiyeti, saniyelik önbellekli)."""
+    global _TIMESTAMP_CACHE
+    now = int(time.time())
+    cached_at, text = _TIMESTAMP_CACHE
+    if cached_at != now:
+        text = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now))
+        _TIMESTAMP_CACHE = (now, text)  # tuple ataması atomik; kilit gerekmez
+    return text
+
+
 # LLM servisi (Together/HF yoksa lokal fallback)
 from llm_service import llm_service  # import en sonda olmalı; döngüsel importu önler
 
@@ -177,29 +374,28 @@ def ask_assistant():
             return jsonify({"error": "No file selected"}), 400
         if not is_allowed_file(uploaded.filename):
             return jsonify({"error": "File type not allowed"}), 400
+        head = uploaded.stream.read(12)
+        uploaded.stream.seek(0)
+        if not looks_like_audio(head):
+            return jsonify({"error": "File content is not a supported audio format"}), 400
 
-        # 2) Geçici kaydetme (güvenli dosya adı + zaman damgası)
-        safe_name = secure_filename(uploaded.filename)
-        unique_name = f"{datetime.now():%Y%m%d_%H%M%S}_{safe_name}"
-        temp_path = str(Path(UPLOAD_DIR) / unique_name)
-        uploaded.save(temp_path)
-        logger.info("Audio file saved: %s", temp_path)
+        # 2) Werkzeug'un akışı doğrudan kullanılır: boyut MAX_CONTENT_LENGTH ile zaten
+        #    sınırlı, büyük yüklemeler diske spool edilmiş; ek kopya ve ffmpeg süreci yok
+        audio = uploaded.stream
+        logger.info("Audio received: %s", uploaded.filename)
 
         # 3) ASR (Whisper)
         try:
-            text = transcribe_audio(temp_path, language=os.getenv("ASR_LANGUAGE", "tr"))
-            logger.info("Transcribed text: %s", text)
+            text = transcribe_audio(audio, language=os.getenv("ASR_LANGUAGE", "tr"))
+            if LOG_TRANSCRIPTS:
+                logger.info("Transcribed text: %s", text)
+            else:
+                logger.info("Transcribed text (len=%d)", len(text))
         except Exception as exc:
             logger.exception("ASR failed")
             return jsonify({"error": "transcription_failed", "details": str(exc)}), 500
-        finally:
-            # 4) Temizleme (başarılı/başarısız)
-            try:
-                os.remove(temp_path)
-            except Exception:
-                pass
 
-        # 5) LLM cevabı
+        # 4) LLM cevabı
         try:
             answer = llm_service.generate_response(text)
             logger.info("Generated response (len=%d)", len(answer))
@@ -207,7 +403,7 @@ def ask_assistant():
             logger.exception("LLM failed")
             return jsonify({"error": "llm_failed", "details": str(exc), "transcribed_text": text}), 500
 
-        # 6) Placeholder TTS (metni txt olarak yayınla)
+        # 5) Placeholder TTS (metni txt olarak yayınla)
         response_url = save_text_response(answer)
 
         return jsonify(
@@ -262,7 +458,8 @@ def serve_response_file(filename: str):
     Not: Üretimde kimlik doğrulama/kota vb. eklemeyi değerlendirin.
     """
     try:
-        return send_from_directory(RESPONSES_DIR, filename, mimetype="text/plain; charset=utf-8")
+        # text/* mimetype'larına Werkzeug charset=utf-8 ekler
+        return send_from_directory(RESPONSES_DIR, filename, mimetype="text/plain")
     except Exception:
         logger.exception("Error serving response file")
         return jsonify({"error": "File not found"}), 404
@@ -270,13 +467,14 @@ def serve_response_file(filename: str):
 
 @app.get("/health")
 def health_check():
-    """Hızlı sağlık kontrolü (ASR ve ffmpeg görünürlüğü dahil)."""
+    """Hızlı sağlık kontrolü (ASR, ffmpeg görünürlüğü ve LLM önbellek sayaçları dahil)."""
     return jsonify(
         {
             "status": "healthy",
             "whisper_loaded": WHISPER_MODEL is not None,
-            "ffmpeg": bool(shutil.which("ffmpeg")),
-            "timestamp": datetime.now().isoformat(),
+            "ffmpeg": FFMPEG_PATH is not None,
+            "llm_cache": llm_service.cache_stats(),
+            "timestamp": _current_timestamp(),
         }
     ), 200
 
@@ -8,7 +8,7 @@ ASR/LLM/TTS ayarları ve HTTP zaman aşımları gibi tüm sabitler burada toplan
 Kullanım:
     from config import Settings
     cfg = Settings.from_env()    # .env ve OS environment'tan okur
-    cfg.ensure_directories()     # uploads/ & responses/ klasörlerini garanti eder
+    cfg.ensure_directories()     # responses/ klasörünü garanti eder
 """
 
 from __future__ import annotations
@@ -75,12 +75,13 @@ class Settings:
     debug: bool = field(default=False)
     port: int = field(default=8000)
 
-    # Dosya/klasör
-    upload_folder: str = field(default="uploads")
+    # Dosya/klasör (yüklemeler bellekte/Werkzeug akışında işlenir; upload klasörü yoktur)
     response_folder: str = field(default="responses")
     allowed_extensions: Set[str] = field(
         default_factory=lambda: {"wav", "mp3", "mp4", "m4a", "flac", "ogg"}
     )
+    # allowed_extensions'tan türetilir (".wav", ".mp3", ...); str.endswith için
+    allowed_suffixes: tuple[str, ...] = field(init=False, repr=False)
 
     # ASR (Whisper)
     whisper_model: str = field(default=DEFAULT_WHISPER_MODEL)
@@ -102,6 +103,9 @@ class Settings:
     elevenlabs_api_key: str | None = field(default=None)
     elevenlabs_voice_id: str = field(default="21m00Tcm4TlvDq8ikWAM")  # varsayılan örnek
 
+    def __post_init__(self) -> None:
+        self.allowed_suffixes = tuple(f".{ext.lower()}" for ext in self.allowed_extensions)
+
     @classmethod
     def from_env(cls) -> "Settings":
         """
@@ -117,7 +121,6 @@ class Settings:
             port=_to_int(os.getenv("PORT"), 8000),
 
             # Dosya/klasör
-            upload_folder=os.getenv("UPLOAD_FOLDER", "uploads"),
             response_folder=os.getenv("RESPONSE_FOLDER", "responses"),
             # allowed_extensions sabit set; istersen CSV'den okutacak bir parser ekleyebilirsin
 
@@ -144,8 +147,7 @@ class Settings:
     # ------------------------ Yardımcı metotlar ------------------------ #
 
     def ensure_directories(self) -> None:
-        """Yükleme ve yanıt klasörlerinin varlığını garanti eder."""
-        Path(self.upload_folder).mkdir(parents=True, exist_ok=True)
+        """Yanıt klasörünün varlığını garanti eder."""
         Path(self.response_folder).mkdir(parents=True, exist_ok=True)
 
     # Flask app.config ile uyumlu key'ler gerekiyorsa bu metodu kullan
@@ -162,7 +164,4 @@ class Settings:
         """
         Dosya uzantısının izinli olup olmadığını kontrol eder.
         """
-        if "." not in filename:
-            return False
-        ext = filename.rsplit(".", 1)[1].lower()
-        return ext in self.allowed_extensions
+        return filename.lower().endswith(self.allowed_suffixes)
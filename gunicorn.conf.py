@@ -0,0 +1,33 @@
+"""
+gunicorn.conf.py
+----------------
+
+Üretim sunucusu ayarları. `gunicorn app:app` komutu bu dosyayı otomatik okur.
+
+Neden gthread?
+- Bir istek Whisper + LLM HTTP çağrısı boyunca onlarca saniye sürebilir.
+  Senkron worker'da bu süre boyunca worker başka isteğe bakamaz.
+- CTranslate2 (Whisper) ve ağ I/O'su GIL'i bıraktığı için, aynı worker içindeki
+  thread'ler ASR/LLM beklemelerini üst üste bindirebilir.
+- Her worker kendi Whisper kopyasını yükler; worker sayısını RAM'e göre seçin.
+- app.py WEB_CONCURRENCY'yi okuyup WHISPER_CPU_THREADS varsayılanını
+  çekirdek / (WEB_CONCURRENCY × WHISPER_NUM_WORKERS) olarak hesaplar; böylece
+  tüm süreçlerin CTranslate2 thread'leri toplamda çekirdek sayısını aşmaz.
+- preload_app kullanılmaz: model her worker'da fork'tan sonra arka planda yüklenir
+  (CTranslate2'nin iç thread havuzları fork'u güvenle atlatamaz).
+- /responses/<ad> dosyaları ortak responses/ klasörüne yazılır; GET isteğini hangi
+  worker alırsa alsın dosyayı bulur.
+"""
+
+from __future__ import annotations
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Uzun ASR + LLM zincirinde worker'ın erken öldürülmemesi için
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+keepalive = 5
@@ -13,20 +13,35 @@ Together → Hugging Face → Local (kural tabanlı fallback).
 - HF_MODEL               (varsayılan: mistralai/Mistral-7B-Instruct-v0.1)
 - LLM_TIMEOUT_SECONDS    (varsayılan: 60)
 - LLM_RETRY_COUNT        (varsayılan: 1)
+- LLM_CACHE_TTL_SECONDS  (varsayılan: 3600)
+- LLM_CACHE_MAX_SIZE     (varsayılan: 1024; 0 → önbellek kapalı)
+- LLM_SEMANTIC_CACHE     (varsayılan: false; sentence-transformers gerektirir)
+- LLM_SEMANTIC_MODEL     (varsayılan: sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2)
+- LLM_SEMANTIC_THRESHOLD (varsayılan: 0.92; kosinüs benzerliği eşiği)
 
 Not: Bu modül, dışarıya tek bir global örnek (`llm_service`) sunar.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Final, Optional
+from typing import Any, Final, Optional
 
+import numpy as np
+import orjson
 import requests
 from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 logger = logging.getLogger(__name__)
 
@@ -47,52 +62,332 @@ DEFAULT_HF_MODEL: Final[str] = os.getenv(
 
 DEFAULT_TIMEOUT: Final[int] = int(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
 DEFAULT_RETRIES: Final[int] = int(os.getenv("LLM_RETRY_COUNT", "1"))  # toplam deneme = 1 + retries
+DEFAULT_POOL_SIZE: Final[int] = 32  # eşzamanlı istekler için host başına bağlantı havuzu
+
+# İstekler arasında değişmeyen parçalar: her çağrıda yeniden kurulmaz.
+# Not: json= ile serileştirildikleri için düz dict'tir; salt-okunur kabul edin.
+TOGETHER_URL: Final[str] = "https://api.together.xyz/v1/chat/completions"
+HF_URL: Final[str] = f"https://api-inference.huggingface.co/models/{DEFAULT_HF_MODEL}"
+# Önbellek anahtarlarında kullanılan modeller, sağlayıcı sırasıyla
+_PROVIDER_MODELS: Final[tuple[str, ...]] = (DEFAULT_TOGETHER_MODEL, DEFAULT_HF_MODEL)
+
+_TOGETHER_SYSTEM_MESSAGE: Final[dict[str, str]] = {
+    "role": "system",
+    "content": (
+        "Sen bir e-ticaret müşteri hizmetleri asistanısın. "
+        "Kısa, açık ve çözüm odaklı yanıt ver. "
+        "Gerekirse takip/işlem adımlarını net sırala."
+    ),
+}
+
+_HF_PROMPT_PREFIX: Final[str] = (
+    "Sen bir e-ticaret müşteri hizmetleri asistanısın. "
+    "Müşteri sorusuna kısa, açık ve yardımcı bir yanıt ver.\n\n"
+    "Müşteri sorusu: "
+)
+
+_HF_PARAMETERS: Final[dict[str, object]] = {
+    "max_new_tokens": 150,
+    "temperature": 0.7,
+    "do_sample": True,
+    "return_full_text": False,
+}
+
+DEFAULT_CACHE_TTL: Final[int] = int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+DEFAULT_CACHE_SIZE: Final[int] = int(os.getenv("LLM_CACHE_MAX_SIZE", "1024"))
+
+SEMANTIC_CACHE_ENABLED: Final[bool] = os.getenv("LLM_SEMANTIC_CACHE", "false").lower() == "true"
+DEFAULT_SEMANTIC_MODEL: Final[str] = os.getenv(
+    "LLM_SEMANTIC_MODEL",
+    "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+)
+DEFAULT_SEMANTIC_THRESHOLD: Final[float] = float(os.getenv("LLM_SEMANTIC_THRESHOLD", "0.92"))
 
 
 # =============================================================================
-# Yardımcı: HTTP istemcisi (timeout + basit retry)
+# Yardımcı: HTTP istemcisi (timeout + urllib3 retry + bağlantı havuzu)
 # =============================================================================
 
+_RETRY_STATUSES: Final[tuple[int, ...]] = (502, 503, 504)
+
+
+class _LoggingRetry(Retry):
+    """
+    502/503/504 nedeniyle yapılan her yeniden denemeyi WARNING olarak loglar.
+    urllib3 bağlantı hatası retry'larını zaten WARNING ile loglar, durum kodu
+    retry'larını ise yalnızca DEBUG'da; geçici 5xx'ler görünür kalsın diye burada yükseltilir.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if error is None and response is not None:
+            logger.warning(
+                "LLM HTTP retry %d/%d: %s %s -> %s",
+                len(new_retry.history), self.total + len(self.history), method, url, response.status,
+            )
+        return new_retry
+
+
 @dataclass
 class HttpClient:
-    """requests.Session sarmalayıcısı: ortak header, timeout ve basit retry yönetimi."""
+    """
+    requests.Session sarmalayıcısı: ortak header, timeout ve retry yönetimi.
+
+    Retry urllib3 seviyesinde yapılır: bağlantı hataları ve 502/503/504 yanıtları
+    üstel backoff ile yeniden denenir. Diğer 4xx/5xx yanıtlar olduğu gibi döner.
+    """
     session: Session
     timeout_seconds: int = DEFAULT_TIMEOUT
     retries: int = DEFAULT_RETRIES
+    pool_size: int = DEFAULT_POOL_SIZE
+
+    def __post_init__(self) -> None:
+        retry = _LoggingRetry(
+            total=max(0, self.retries),
+            backoff_factor=0.3,
+            status_forcelist=_RETRY_STATUSES,
+            allowed_methods=frozenset({"POST"}),
+            raise_on_status=False,  # son deneme de 5xx ise yanıtı çağırana bırak
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
 
     def post_json(self, url: str, headers: dict, payload: dict) -> Response:
-        """
-        JSON POST eder. Basit retry uygular (ağ/transient hatalarda).
-        UYARI: 4xx türü kalıcı hatalarda retry yapmaz.
-        """
-        last_exc: Optional[Exception] = None
-        attempts = 1 + max(0, self.retries)
-
-        for attempt in range(1, attempts + 1):
-            try:
-                resp = self.session.post(
-                    url,
-                    headers=headers,
-                    json=payload,
-                    timeout=self.timeout_seconds,
-                )
-                return resp
-            except (requests.ConnectionError, requests.Timeout) as exc:
-                last_exc = exc
-                logger.warning(
-                    "POST %s attempt %d/%d failed: %s",
-                    url, attempt, attempts, exc
-                )
-        # tüm denemeler bitti
-        if last_exc:
-            raise last_exc
-        raise RuntimeError("Unknown error in HttpClient.post_json")
+        """JSON POST eder; retry/backoff session adapter'ı tarafından uygulanır."""
+        resp = self.session.post(
+            url,
+            headers=headers,
+            json=payload,
+            timeout=self.timeout_seconds,
+        )
+        if resp.status_code in _RETRY_STATUSES:
+            # raise_on_status=False: tükenen retry'lar istisna değil, son yanıt olarak döner
+            logger.warning(
+                "LLM HTTP retries exhausted: %s -> %s after %d retries",
+                url, resp.status_code, max(0, self.retries),
+            )
+        return resp
 
 
 # Tek bir Session kullan (keep-alive faydası)
 _http = HttpClient(session=requests.Session())
 
 
+# =============================================================================
+# Yardımcı: Yanıt önbelleği (exact-match, LRU + TTL)
+# =============================================================================
+
+class LLMCache:
+    """
+    Aynı (model, metin) çifti için üretilmiş yanıtı bellekte tutar.
+    Anahtar, yanıtı gerçekten üreten sağlayıcının modelidir (Together düşüp HF yanıt
+    verdiyse HF modeli); böylece bir modelin yanıtı diğerininmiş gibi dönmez.
+    OrderedDict ile LRU sırası korunur; süresi dolan kayıtlar okunurken düşürülür.
+    Thread-safe'dir (gthread worker'ları aynı örneği paylaşır).
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl_seconds: int = DEFAULT_CACHE_TTL) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Model adı + normalize edilmiş metinden sabit uzunlukta anahtar üretir."""
+        raw = f"{model}|{text.strip().lower()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Geçerli bir kayıt varsa yanıtı, yoksa None döner."""
+        return self.get_first((key,))
+
+    def get_first(self, keys: tuple[str, ...]) -> Optional[str]:
+        """
+        Anahtarları sırayla dener; ilk geçerli kaydın yanıtını döner.
+        Tek bir arama sayılır (hits/misses anahtar başına değil, çağrı başına artar).
+        """
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                item = self._data.get(key)
+                if item is None:
+                    continue
+                value, expires_at = item
+                if expires_at < now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Yanıtı kaydeder; kapasite aşılırsa en eski kaydı atar."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """/health için özet sayaçlar."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+class SemanticCache:
+    """
+    Anlamca benzer sorular için önbellek ("siparişim nerede" ~ "nerede benim siparişim").
+
+    L2-normalize gömmeler sabit boyutlu bir float32 matriste tutulur; iç çarpım
+    kosinüs benzerliğine eşittir (FAISS IndexFlatIP ile aynı arama, ek bağımlılık yok).
+    Kapasite dolunca en eski kayıt ezilir (FIFO halka tampon).
+    """
+
+    def __init__(
+        self,
+        embedder: Any,
+        threshold: float = DEFAULT_SEMANTIC_THRESHOLD,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        if maxsize <= 0:
+            raise ValueError("SemanticCache maxsize must be positive")
+        self.embedder = embedder
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.hits = 0
+        dim = embedder.get_sentence_embedding_dimension()
+        self._vectors = np.zeros((self.maxsize, dim), dtype=np.float32)
+        self._answers: list[Optional[tuple[str, str]]] = [None] * self.maxsize  # (model, yanıt)
+        self._count = 0  # şimdiye kadar eklenen toplam kayıt
+        self._lock = threading.Lock()
+
+    def lookup(self, text: str) -> tuple[Optional[tuple[str, str]], np.ndarray]:
+        """
+        En yakın kaydı arar.
+
+        Returns:
+            ((model, yanıt) veya None, metnin gömmesi). Gömme, `add` çağrısında
+            yeniden hesaplanmasın diye çağırana geri verilir.
+        """
+        emb = self.embedder.encode(text, normalize_embeddings=True).astype(np.float32, copy=False)
+        with self._lock:
+            n = min(self._count, self.maxsize)
+            if n == 0:
+                return None, emb
+            sims = self._vectors[:n] @ emb
+            idx = int(np.argmax(sims))
+            if sims[idx] >= self.threshold:
+                self.hits += 1
+                return self._answers[idx], emb
+        return None, emb
+
+    def add(self, emb: np.ndarray, model: str, answer: str) -> None:
+        """Gömme + (model, yanıt) ekler; doluysa en eskisinin yerine yazar."""
+        with self._lock:
+            slot = self._count % self.maxsize
+            self._vectors[slot] = emb
+            self._answers[slot] = (model, answer)
+            self._count += 1
+
+
+def _load_semantic_cache() -> Optional[SemanticCache]:
+    """
+    LLM_SEMANTIC_CACHE açıksa gömme modelini bir kez yükler; aksi halde None.
+    LLM_CACHE_MAX_SIZE=0 her iki önbelleği de kapatır (model hiç yüklenmez).
+    """
+    if not SEMANTIC_CACHE_ENABLED or DEFAULT_CACHE_SIZE <= 0:
+        return None
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logger.warning("LLM_SEMANTIC_CACHE is set but sentence-transformers is not installed; disabled.")
+        return None
+    try:
+        embedder = SentenceTransformer(DEFAULT_SEMANTIC_MODEL, device="cpu")
+    except Exception:
+        logger.exception("Failed to load semantic cache model: %s", DEFAULT_SEMANTIC_MODEL)
+        return None
+    logger.info("Semantic cache enabled (model=%s)", DEFAULT_SEMANTIC_MODEL)
+    return SemanticCache(embedder)
+
+
+# =============================================================================
+# Lokal fallback kuralları (import anında bir kez derlenir)
+# =============================================================================
+
+def _keyword_pattern(*keywords: str) -> re.Pattern[str]:
+    """Anahtar kelimelerden tek bir alt-dize (substring) regex'i üretir."""
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+_ORDER_PATTERN: Final[re.Pattern[str]] = _keyword_pattern(
+    "sipariş", "order", "nerede", "durum", "status", "takip"
+)
+
+_ORDER_RESPONSES: Final[tuple[str, ...]] = (
+    "Siparişiniz kargoya verilmiştir; 2-4 iş günü içinde teslim edilmesi beklenir. "
+    "Takip numaranız SMS/e-posta ile iletilecektir.",
+    "Siparişiniz hazırlanıyor; kısa süre içinde kargoya teslim edilecektir.",
+    "Siparişiniz depo çıkışı yapılmıştır; 1-2 iş günü içinde adresinize teslim edilmesi beklenir.",
+)
+
+# Sıra önemlidir: ilk eşleşen kategori kazanır.
+_LOCAL_RULES: Final[tuple[tuple[re.Pattern[str], str], ...]] = (
+    (
+        _keyword_pattern("iade", "return", "geri", "değişim", "exchange"),
+        "İade/Değişim işleminizi hesabınızdaki ‘Siparişlerim’ bölümünden başlatabilirsiniz. "
+        "İade süreci 14 gün içinde tamamlanır; ücret iadesi 3-5 iş günü içinde hesabınıza geçer.",
+    ),
+    (
+        _keyword_pattern("ürün", "product", "stok", "stock", "var mı", "mevcut"),
+        "Güncel stok durumu ürün sayfasında yer alır. Stok dışı ürünler için bildirim oluşturabilirsiniz.",
+    ),
+    (
+        _keyword_pattern("kargo", "shipping", "teslimat", "delivery", "gönderi"),
+        "Kargo süremiz şehir içi 1-2, şehir dışı 2-4 iş günüdür. 150 TL üzeri siparişlerde kargo ücretsizdir.",
+    ),
+    (
+        _keyword_pattern("fiyat", "price", "indirim", "discount", "kampanya", "promosyon"),
+        "Güncel kampanyaları kampanyalar sayfasından takip edebilirsiniz. Yeni üyeler için ek indirimler bulunur.",
+    ),
+    (
+        _keyword_pattern("ödeme", "payment", "kredi kartı", "card", "taksit"),
+        "Kredi/banka kartı, havale/EFT ve kapıda ödeme desteklenir. Uygun kartlara taksit seçenekleri mevcuttur.",
+    ),
+    (
+        _keyword_pattern("müşteri hizmetleri", "customer service", "iletişim", "telefon"),
+        "Müşteri hizmetlerine 444 0 123 üzerinden ulaşabilir veya canlı destekten yazabilirsiniz.",
+    ),
+    (
+        _keyword_pattern("hesap", "account", "üyelik", "membership", "şifre", "password"),
+        "Hesap işlemleri için ‘Hesabım’ bölümünü kullanın. Şifre sıfırlama için ‘Şifremi Unuttum’ bağlantısını tıklayın.",
+    ),
+    (
+        _keyword_pattern("yardım", "help", "destek", "support", "problem", "sorun"),
+        "Size nasıl yardımcı olabiliriz? Teknik destek, sipariş takibi ve ürün bilgileri konularında yardımcı olabiliriz.",
+    ),
+)
+
+_LOCAL_DEFAULT_RESPONSE: Final[str] = (
+    "Müşteri hizmetlerimiz size yardımcı olmak için burada. "
+    "Sipariş, kargo, iade ve ürün bilgileriyle ilgili sorularınızı yanıtlayabilirim."
+)
+
+
 # =============================================================================
 # LLM Servisi
 # =============================================================================
@@ -107,6 +402,10 @@ class LLMService:
         self.together_api_key: Optional[str] = os.getenv("TOGETHER_API_KEY")
         self.huggingface_api_key: Optional[str] = os.getenv("HUGGINGFACE_API_KEY")
         self.replicate_api_key: Optional[str] = os.getenv("REPLICATE_API_KEY")  # şimdilik kullanılmıyor
+        self._together_headers = self._auth_headers(self.together_api_key)
+        self._hf_headers = self._auth_headers(self.huggingface_api_key)
+        self.cache = LLMCache()
+        self.semantic_cache: Optional[SemanticCache] = _load_semantic_cache()
 
     # --------------------------------------------------------------------- #
     # Public API
@@ -124,19 +423,39 @@ class LLMService:
 
         Not:
             Boş/yalnızca boşluk içeren girişlerde kısa uyarı döner.
+            Sağlayıcı yanıtları önbelleğe alınır; lokal fallback alınmaz
+            (sağlayıcı geri geldiğinde eski fallback yanıtı dönmesin).
         """
         text = (text or "").strip()
         if not text:
             return "Seni duyamadım, tekrar eder misin?"
 
+        # 0) Exact-match önbellek: sağlayıcı önceliğiyle (Together, sonra HF) model anahtarları
+        cached = self.cache.get_first(
+            tuple(LLMCache.make_key(model, text) for model in _PROVIDER_MODELS)
+        )
+        if cached is not None:
+            return cached
+
+        # 0b) Semantik önbellek (opsiyonel)
+        emb: Optional[np.ndarray] = None
+        if self.semantic_cache is not None:
+            hit, emb = self.semantic_cache.lookup(text)
+            if hit is not None:
+                model, cached = hit
+                self.cache.set(LLMCache.make_key(model, text), cached)
+                return cached
+
         # 1) Together
         out = self._generate_together(text)
         if out:
+            self._remember(DEFAULT_TOGETHER_MODEL, text, emb, out)
             return out
 
         # 2) Hugging Face
         out = self._generate_huggingface(text)
         if out:
+            self._remember(DEFAULT_HF_MODEL, text, emb, out)
             return out
 
         # 3) Lokal fallback
@@ -152,30 +471,15 @@ class LLMService:
             logger.debug("Together.ai API key not set; skipping Together provider.")
             return None
 
-        url = "https://api.together.xyz/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {self.together_api_key}",
-            "Content-Type": "application/json",
-        }
         payload = {
             "model": DEFAULT_TOGETHER_MODEL,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        "Sen bir e-ticaret müşteri hizmetleri asistanısın. "
-                        "Kısa, açık ve çözüm odaklı yanıt ver. "
-                        "Gerekirse takip/işlem adımlarını net sırala."
-                    ),
-                },
-                {"role": "user", "content": text},
-            ],
+            "messages": [_TOGETHER_SYSTEM_MESSAGE, {"role": "user", "content": text}],
             "max_tokens": 200,
             "temperature": 0.5,
         }
 
         try:
-            resp = _http.post_json(url, headers, payload)
+            resp = _http.post_json(TOGETHER_URL, self._together_headers, payload)
         except Exception as exc:
             logger.error("Together.ai request failed: %s", exc)
             return None
@@ -185,7 +489,7 @@ class LLMService:
             return None
 
         try:
-            data = resp.json()
+            data = orjson.loads(resp.content)
             choice0 = (data.get("choices") or [{}])[0]
             message = choice0.get("message") or {}
             content = (message.get("content") or "").strip()
@@ -203,29 +507,13 @@ class LLMService:
             logger.debug("Hugging Face API key not set; skipping HF provider.")
             return None
 
-        url = f"https://api-inference.huggingface.co/models/{DEFAULT_HF_MODEL}"
-        headers = {
-            "Authorization": f"Bearer {self.huggingface_api_key}",
-            "Content-Type": "application/json",
-        }
-
-        prompt = (
-            "Sen bir e-ticaret müşteri hizmetleri asistanısın. "
-            "Müşteri sorusuna kısa, açık ve yardımcı bir yanıt ver.\n\n"
-            f"Müşteri sorusu: {text}\n\nYanıt:"
-        )
         payload = {
-            "inputs": prompt,
-            "parameters": {
-                "max_new_tokens": 150,
-                "temperature": 0.7,
-                "do_sample": True,
-                "return_full_text": False,
-            },
+            "inputs": f"{_HF_PROMPT_PREFIX}{text}\n\nYanıt:",
+            "parameters": _HF_PARAMETERS,
         }
 
         try:
-            resp = _http.post_json(url, headers, payload)
+            resp = _http.post_json(HF_URL, self._hf_headers, payload)
         except Exception as exc:
             logger.error("Hugging Face request failed: %s", exc)
             return None
@@ -235,7 +523,7 @@ class LLMService:
             return None
 
         try:
-            data = resp.json()
+            data = orjson.loads(resp.content)
             # HF bazen liste döndürür, bazen obje
             if isinstance(data, list) and data:
                 out = (data[0].get("generated_text") or "").strip()
@@ -257,46 +545,15 @@ class LLMService:
         try:
             t = (text or "").lower()
 
-            if any(w in t for w in ("sipariş", "order", "nerede", "durum", "status", "takip")):
-                responses = (
-                    "Siparişiniz kargoya verilmiştir; 2-4 iş günü içinde teslim edilmesi beklenir. "
-                    "Takip numaranız SMS/e-posta ile iletilecektir.",
-                    "Siparişiniz hazırlanıyor; kısa süre içinde kargoya teslim edilecektir.",
-                    "Siparişiniz depo çıkışı yapılmıştır; 1-2 iş günü içinde adresinize teslim edilmesi beklenir.",
-                )
-                return responses[hash(t) % len(responses)]
-
-            if any(w in t for w in ("iade", "return", "geri", "değişim", "exchange")):
-                return (
-                    "İade/Değişim işleminizi hesabınızdaki ‘Siparişlerim’ bölümünden başlatabilirsiniz. "
-                    "İade süreci 14 gün içinde tamamlanır; ücret iadesi 3-5 iş günü içinde hesabınıza geçer."
-                )
+            if _ORDER_PATTERN.search(t):
+                # crc32: tek geçişli C implementasyonu; hash()'in aksine süreçler arası sabit
+                return _ORDER_RESPONSES[zlib.crc32(t.encode("utf-8")) % len(_ORDER_RESPONSES)]
 
-            if any(w in t for w in ("ürün", "product", "stok", "stock", "var mı", "mevcut")):
-                return "Güncel stok durumu ürün sayfasında yer alır. Stok dışı ürünler için bildirim oluşturabilirsiniz."
+            for pattern, answer in _LOCAL_RULES:
+                if pattern.search(t):
+                    return answer
 
-            if any(w in t for w in ("kargo", "shipping", "teslimat", "delivery", "gönderi")):
-                return "Kargo süremiz şehir içi 1-2, şehir dışı 2-4 iş günüdür. 150 TL üzeri siparişlerde kargo ücretsizdir."
-
-            if any(w in t for w in ("fiyat", "price", "indirim", "discount", "kampanya", "promosyon")):
-                return "Güncel kampanyaları kampanyalar sayfasından takip edebilirsiniz. Yeni üyeler için ek indirimler bulunur."
-
-            if any(w in t for w in ("ödeme", "payment", "kredi kartı", "card", "taksit")):
-                return "Kredi/banka kartı, havale/EFT ve kapıda ödeme desteklenir. Uygun kartlara taksit seçenekleri mevcuttur."
-
-            if any(w in t for w in ("müşteri hizmetleri", "customer service", "iletişim", "telefon")):
-                return "Müşteri hizmetlerine 444 0 123 üzerinden ulaşabilir veya canlı destekten yazabilirsiniz."
-
-            if any(w in t for w in ("hesap", "account", "üyelik", "membership", "şifre", "password")):
-                return "Hesap işlemleri için ‘Hesabım’ bölümünü kullanın. Şifre sıfırlama için ‘Şifremi Unuttum’ bağlantısını tıklayın."
-
-            if any(w in t for w in ("yardım", "help", "destek", "support", "problem", "sorun")):
-                return "Size nasıl yardımcı olabiliriz? Teknik destek, sipariş takibi ve ürün bilgileri konularında yardımcı olabiliriz."
-
-            return (
-                "Müşteri hizmetlerimiz size yardımcı olmak için burada. "
-                "Sipariş, kargo, iade ve ürün bilgileriyle ilgili sorularınızı yanıtlayabilirim."
-            )
+            return _LOCAL_DEFAULT_RESPONSE
         except Exception as exc:
             logger.error("Local fallback failed: %s", exc)
             return "Üzgünüm, şu anda yanıt üretemiyorum. Lütfen daha sonra tekrar deneyin."
@@ -304,6 +561,25 @@ class LLMService:
     # --------------------------------------------------------------------- #
     # Yardımcılar
     # --------------------------------------------------------------------- #
+    def _remember(self, model: str, text: str, emb: Optional[np.ndarray], answer: str) -> None:
+        """Yanıtı üreten modelin anahtarıyla exact ve (varsa) semantik önbelleğe yazar."""
+        self.cache.set(LLMCache.make_key(model, text), answer)
+        if self.semantic_cache is not None and emb is not None:
+            self.semantic_cache.add(emb, model, answer)
+
+    def cache_stats(self) -> dict[str, int]:
+        """Önbellek sayaçları (/health)."""
+        stats = self.cache.stats
+        stats["semantic_hits"] = self.semantic_cache.hits if self.semantic_cache is not None else 0
+        return stats
+
+    @staticmethod
+    def _auth_headers(api_key: Optional[str]) -> dict[str, str]:
+        """Bearer token header'larını bir kez kurar (anahtar yoksa boş sözlük)."""
+        if not api_key:
+            return {}
+        return {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
     @staticmethod
     def _log_api_error(provider: str, resp: Response) -> None:
         """Sağlayıcıya ait HTTP hata detayını güvenli şekilde loglar."""
@@ -4,7 +4,14 @@ import soundfile as sf
 # 3 saniyelik test sesi oluştur
 sample_rate = 16000
 duration = 3
-t = np.linspace(0, duration, int(sample_rate * duration))
-audio = 0.3 * np.sin(2 * np.pi * 440 * t)  # 440 Hz ton
+n = sample_rate * duration
+phase = np.float32(2 * np.pi * 440 / sample_rate)  # örnek başına faz artışı (440 Hz)
 
-sf.write('test_audio.wav', audio, sample_rate)
\ No newline at end of file
+# Tek float32 tampon: faz, sin ve genlik aynı dizi üzerinde yerinde hesaplanır
+audio = np.arange(n, dtype=np.float32)
+audio *= phase
+np.sin(audio, out=audio)
+audio *= np.float32(0.3)
+
+# 16-bit PCM: Whisper'ın beklediği format; float32 → int16 dönüşümü libsndfile'da (C) yapılır
+sf.write('test_audio.wav', audio, sample_rate, subtype='PCM_16')
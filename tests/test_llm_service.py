@@ -0,0 +1,239 @@
+import logging
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_service
+from llm_service import LLMCache, LLMService, SemanticCache
+
+
+class FakeClock:
+    """Monotonic clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(llm_service.time, 'monotonic', fake)
+    return fake
+
+
+class KeywordEmbedder:
+    """Tiny deterministic embedder: one axis per known keyword"""
+
+    KEYWORDS = ('sipariş', 'iade', 'kargo')
+
+    def get_sentence_embedding_dimension(self):
+        return len(self.KEYWORDS)
+
+    def encode(self, text, normalize_embeddings=True):
+        vec = np.array([float(k in text) for k in self.KEYWORDS], dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+
+class TestLLMCache:
+    """Test cases for the exact-match LRU + TTL cache"""
+
+    def test_set_and_get(self, clock):
+        cache = LLMCache(maxsize=4, ttl_seconds=60)
+        cache.set('a', 'answer-a')
+
+        assert cache.get('a') == 'answer-a'
+        assert cache.get('missing') is None
+        assert cache.stats == {'hits': 1, 'misses': 1, 'size': 1}
+
+    def test_lru_eviction(self, clock):
+        cache = LLMCache(maxsize=2, ttl_seconds=60)
+        cache.set('a', '1')
+        cache.set('b', '2')
+        cache.get('a')  # 'b' is now least recently used
+        cache.set('c', '3')
+
+        assert cache.get('b') is None
+        assert cache.get('a') == '1'
+        assert cache.get('c') == '3'
+
+    def test_ttl_expiry(self, clock):
+        cache = LLMCache(maxsize=4, ttl_seconds=10)
+        cache.set('a', '1')
+
+        clock.now += 9
+        assert cache.get('a') == '1'
+
+        clock.now += 2
+        assert cache.get('a') is None
+        assert cache.stats['size'] == 0
+
+    def test_zero_size_disables(self, clock):
+        cache = LLMCache(maxsize=0, ttl_seconds=60)
+        cache.set('a', '1')
+
+        assert cache.get('a') is None
+        assert cache.stats['size'] == 0
+
+    def test_make_key_normalizes_text(self):
+        assert LLMCache.make_key('m', '  Siparişim Nerede ') == LLMCache.make_key('m', 'siparişim nerede')
+        assert LLMCache.make_key('m', 'iade') != LLMCache.make_key('m', 'kargo')
+
+    def test_make_key_depends_on_model(self):
+        assert LLMCache.make_key('together', 'iade') != LLMCache.make_key('hf', 'iade')
+
+    def test_get_first_counts_one_lookup(self, clock):
+        cache = LLMCache(maxsize=4, ttl_seconds=60)
+        cache.set('b', '2')
+
+        assert cache.get_first(('a', 'b')) == '2'
+        assert cache.get_first(('a', 'c')) is None
+        assert cache.stats == {'hits': 1, 'misses': 1, 'size': 1}
+
+
+class TestSemanticCache:
+    """Test cases for the embedding similarity cache"""
+
+    def test_similar_question_hits(self):
+        cache = SemanticCache(KeywordEmbedder(), threshold=0.9, maxsize=4)
+        hit, emb = cache.lookup('siparişim nerede')
+        assert hit is None
+
+        cache.add(emb, 'model', 'kargoda')
+        hit, _ = cache.lookup('nerede benim siparişim')
+
+        assert hit == ('model', 'kargoda')
+        assert cache.hits == 1
+
+    def test_dissimilar_question_misses(self):
+        cache = SemanticCache(KeywordEmbedder(), threshold=0.9, maxsize=4)
+        _, emb = cache.lookup('sipariş')
+        cache.add(emb, 'model', 'kargoda')
+
+        hit, _ = cache.lookup('iade')
+        assert hit is None
+
+    def test_ring_overwrites_oldest(self):
+        cache = SemanticCache(KeywordEmbedder(), threshold=0.9, maxsize=2)
+        for text, answer in (('sipariş', 's'), ('iade', 'i'), ('kargo', 'k')):
+            _, emb = cache.lookup(text)
+            cache.add(emb, 'model', answer)
+
+        assert cache.lookup('sipariş')[0] is None
+        assert cache.lookup('iade')[0] == ('model', 'i')
+        assert cache.lookup('kargo')[0] == ('model', 'k')
+
+    def test_zero_size_rejected(self):
+        with pytest.raises(ValueError):
+            SemanticCache(KeywordEmbedder(), maxsize=0)
+
+    def test_loader_respects_zero_cache_size(self, monkeypatch):
+        monkeypatch.setattr(llm_service, 'SEMANTIC_CACHE_ENABLED', True)
+        monkeypatch.setattr(llm_service, 'DEFAULT_CACHE_SIZE', 0)
+
+        assert llm_service._load_semantic_cache() is None
+
+
+class TestLLMServiceCaching:
+    """Test how generate_response uses the caches"""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        for name in ('TOGETHER_API_KEY', 'HUGGINGFACE_API_KEY'):
+            monkeypatch.delenv(name, raising=False)
+        return LLMService()
+
+    def test_provider_answer_is_cached(self, service, monkeypatch):
+        calls = []
+
+        def fake_together(text):
+            calls.append(text)
+            return 'provider answer'
+
+        monkeypatch.setattr(service, '_generate_together', fake_together)
+
+        assert service.generate_response('Kargo ne zaman?') == 'provider answer'
+        assert service.generate_response('kargo ne zaman?') == 'provider answer'
+        assert len(calls) == 1
+
+    def test_fallback_answer_keyed_by_answering_model(self, service, monkeypatch):
+        monkeypatch.setattr(service, '_generate_together', lambda text: None)
+        monkeypatch.setattr(service, '_generate_huggingface', lambda text: 'hf answer')
+
+        assert service.generate_response('Kargo ne zaman?') == 'hf answer'
+        hf_key = LLMCache.make_key(llm_service.DEFAULT_HF_MODEL, 'Kargo ne zaman?')
+        together_key = LLMCache.make_key(llm_service.DEFAULT_TOGETHER_MODEL, 'Kargo ne zaman?')
+        assert service.cache.get(hf_key) == 'hf answer'
+        assert service.cache.get(together_key) is None
+
+    def test_together_answer_preferred_over_cached_hf(self, service, monkeypatch):
+        service.cache.set(LLMCache.make_key(llm_service.DEFAULT_HF_MODEL, 'iade'), 'hf')
+        service.cache.set(LLMCache.make_key(llm_service.DEFAULT_TOGETHER_MODEL, 'iade'), 'together')
+
+        assert service.generate_response('iade') == 'together'
+
+    def test_local_fallback_is_not_cached(self, service):
+        answer = service.generate_response('Kargo ne zaman?')
+
+        assert answer
+        assert service.cache.stats['size'] == 0
+
+    def test_semantic_hit_fills_exact_cache(self, service, monkeypatch):
+        service.semantic_cache = SemanticCache(KeywordEmbedder(), threshold=0.9, maxsize=4)
+        monkeypatch.setattr(service, '_generate_together', lambda text: 'iade 14 gün')
+
+        service.generate_response('iade nasıl yapılır')
+        monkeypatch.setattr(service, '_generate_together', lambda text: None)
+
+        assert service.generate_response('iade istiyorum') == 'iade 14 gün'
+        assert service.semantic_cache.hits == 1
+        assert service.cache_stats()['size'] == 2
+
+
+class UnavailableHandler(BaseHTTPRequestHandler):
+    """Always answers 503"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.send_response(503)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def unavailable_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), UnavailableHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/v1'
+    server.shutdown()
+    server.server_close()
+
+
+class TestHttpClient:
+    """Test retry visibility of the shared HTTP client"""
+
+    def test_status_retries_are_logged(self, unavailable_url, caplog):
+        client = llm_service.HttpClient(session=requests.Session(), retries=2)
+        client.session.get_adapter(unavailable_url).max_retries.backoff_factor = 0
+
+        with caplog.at_level(logging.WARNING, logger='llm_service'):
+            resp = client.post_json(unavailable_url, {}, {})
+
+        assert resp.status_code == 503
+        messages = [record.getMessage() for record in caplog.records]
+        assert sum('LLM HTTP retry' in m for m in messages) == 2
+        assert any('retries exhausted' in m and '503' in m for m in messages)
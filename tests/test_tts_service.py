@@ -0,0 +1,291 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_service
+from tts_service import TTSService, get_tts_service
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response (streaming + JSON)"""
+
+    def __init__(self, status_code=200, chunks=(), payload=None, text=''):
+        self.status_code = status_code
+        self._chunks = list(chunks)
+        self._payload = payload
+        self.text = text
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size=1):
+        yield from self._chunks
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    """Records calls and replays queued responses per HTTP method"""
+
+    def __init__(self, post=(), get=()):
+        self.queues = {'post': list(post), 'get': list(get)}
+        self.calls = []
+
+    def _next(self, method, url):
+        self.calls.append((method, url))
+        queue = self.queues[method]
+        return queue.pop(0) if len(queue) > 1 else queue[0]
+
+    def post(self, url, **kwargs):
+        return self._next('post', url)
+
+    def get(self, url, **kwargs):
+        return self._next('get', url)
+
+
+class FakeClock:
+    """Monotonic clock advanced only by time.sleep"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def no_keys(monkeypatch):
+    monkeypatch.delenv('ELEVENLABS_API_KEY', raising=False)
+    monkeypatch.delenv('REPLICATE_API_KEY', raising=False)
+
+
+@pytest.fixture
+def all_keys(monkeypatch):
+    monkeypatch.setenv('ELEVENLABS_API_KEY', 'eleven-key')
+    monkeypatch.setenv('REPLICATE_API_KEY', 'replicate-key')
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(tts_service.time, 'monotonic', fake.monotonic)
+    monkeypatch.setattr(tts_service.time, 'sleep', fake.sleep)
+    monkeypatch.setattr(tts_service.random, 'uniform', lambda a, b: 1.0)
+    return fake
+
+
+class TestProviderRouting:
+    """Test provider selection and fallback order"""
+
+    def test_providers_without_keys(self, no_keys):
+        assert TTSService()._providers == []
+
+    def test_providers_with_keys(self, all_keys):
+        names = [name for name, _ in TTSService()._providers]
+        assert names == ['ElevenLabs', 'Replicate Coqui XTTS']
+
+    def test_fallback_order(self, all_keys, monkeypatch, tmp_path):
+        service = TTSService()
+        calls = []
+
+        def provider(name, result):
+            def generate(text, output_path):
+                calls.append(name)
+                return result
+            return generate
+
+        service._providers = [
+            ('ElevenLabs', provider('eleven', False)),
+            ('Replicate Coqui XTTS', provider('replicate', True)),
+        ]
+        monkeypatch.setattr(service, 'generate_audio_local_placeholder', provider('placeholder', True))
+
+        assert service.generate_audio('merhaba', str(tmp_path / 'out.mp3'))
+        assert calls == ['eleven', 'replicate']
+
+    def test_placeholder_when_all_fail(self, all_keys, monkeypatch, tmp_path):
+        service = TTSService()
+        session = FakeSession(post=[FakeResponse(status_code=500)])
+        monkeypatch.setattr(service, '_session', session)
+        output = tmp_path / 'out.mp3'
+
+        assert service.generate_audio('merhaba', str(output))
+        assert [method for method, _ in session.calls] == ['post', 'post']
+        assert output.read_text(encoding='utf-8').startswith('# Audio Placeholder')
+
+
+class TestStreamingDownloads:
+    """Test that streamed audio lands intact on disk"""
+
+    def test_elevenlabs_stream_to_file(self, all_keys, monkeypatch, tmp_path):
+        chunks = [b'ID3', bytes(range(256)) * 300, b'\x00\xff' * 17]
+        service = TTSService()
+        monkeypatch.setattr(service, '_session', FakeSession(post=[FakeResponse(chunks=chunks)]))
+        output = tmp_path / 'eleven.mp3'
+
+        assert service.generate_audio_elevenlabs('merhaba', str(output))
+        assert output.read_bytes() == b''.join(chunks)
+
+    def test_replicate_poll_then_download(self, all_keys, monkeypatch, clock, tmp_path):
+        chunks = [b'RIFF', b'\x01' * 70000]
+        session = FakeSession(
+            post=[FakeResponse(status_code=201, payload={'id': 'abc'})],
+            get=[
+                FakeResponse(payload={'status': 'processing'}),
+                FakeResponse(status_code=503),
+                FakeResponse(payload={'status': 'succeeded', 'output': 'https://cdn/x.wav'}),
+                FakeResponse(chunks=chunks),
+            ],
+        )
+        service = TTSService()
+        monkeypatch.setattr(service, '_session', session)
+        output = tmp_path / 'replicate.wav'
+
+        assert service.generate_audio_replicate('merhaba', str(output))
+        assert output.read_bytes() == b''.join(chunks)
+        assert clock.sleeps == [0.25, 0.5]
+        assert session.calls[-1] == ('get', 'https://cdn/x.wav')
+
+
+class TestReplicatePolling:
+    """Test the Replicate status poll backoff and deadline"""
+
+    def test_polling_stops_at_deadline(self, all_keys, monkeypatch, clock, tmp_path):
+        session = FakeSession(
+            post=[FakeResponse(status_code=201, payload={'id': 'abc'})],
+            get=[FakeResponse(payload={'status': 'processing'})],
+        )
+        service = TTSService()
+        monkeypatch.setattr(service, '_session', session)
+
+        assert not service.generate_audio_replicate('merhaba', str(tmp_path / 'out.wav'))
+        assert clock.now >= tts_service.REPLICATE_POLL_TIMEOUT
+        assert clock.now < tts_service.REPLICATE_POLL_TIMEOUT + tts_service.REPLICATE_POLL_MAX_DELAY
+        assert clock.sleeps[:5] == [0.25, 0.5, 1.0, 2.0, 4.0]
+        assert max(clock.sleeps) == tts_service.REPLICATE_POLL_MAX_DELAY
+
+    def test_failed_prediction_stops_polling(self, all_keys, monkeypatch, clock, tmp_path):
+        session = FakeSession(
+            post=[FakeResponse(status_code=201, payload={'id': 'abc'})],
+            get=[FakeResponse(payload={'status': 'failed'})],
+        )
+        service = TTSService()
+        monkeypatch.setattr(service, '_session', session)
+
+        assert not service.generate_audio_replicate('merhaba', str(tmp_path / 'out.wav'))
+        assert len(session.calls) == 2
+        assert clock.sleeps == []
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    """Always answers 503 and counts requests per method"""
+
+    hits = {}
+
+    def _respond(self):
+        StatusHandler.hits[self.command] = StatusHandler.hits.get(self.command, 0) + 1
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.send_response(503)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def unavailable_server():
+    StatusHandler.hits = {}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StatusHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+class TestRetryPolicy:
+    """Test the shared session's urllib3 retry policy"""
+
+    def test_retry_configuration(self, no_keys):
+        retry = TTSService()._session.get_adapter('https://api.replicate.com').max_retries
+
+        assert retry.read == 0
+        assert not retry.is_retry('POST', 503)
+        assert retry.is_retry('GET', 503)
+
+    def test_post_not_retried_get_retried(self, no_keys, unavailable_server):
+        session = TTSService()._session
+        session.mount('http://', session.get_adapter('https://api.replicate.com'))
+
+        assert session.post(unavailable_server, json={}).status_code == 503
+        assert session.get(unavailable_server).status_code == 503
+        assert StatusHandler.hits == {'POST': 1, 'GET': 3}
+
+
+class TestPlaceholder:
+    """Test the local placeholder writer"""
+
+    def test_placeholder_written_in_full(self, no_keys, tmp_path):
+        output = tmp_path / 'placeholder.mp3'
+
+        assert TTSService().generate_audio_local_placeholder('Siparişiniz yolda', str(output))
+        content = output.read_text(encoding='utf-8')
+        assert '# Text: Siparişiniz yolda' in content
+        assert content.endswith('# Burada normalde gerçek ses dosyası olurdu.\n')
+
+    def test_placeholder_handles_short_writes(self, no_keys, monkeypatch, tmp_path):
+        real_write = os.write
+        monkeypatch.setattr(tts_service.os, 'write', lambda fd, data: real_write(fd, bytes(data[:7])))
+        output = tmp_path / 'placeholder.mp3'
+
+        assert TTSService().generate_audio_local_placeholder('çağrı', str(output))
+        monkeypatch.undo()
+        assert '# Text: çağrı\n' in output.read_text(encoding='utf-8')
+
+    def test_placeholder_truncates_existing_file(self, no_keys, tmp_path):
+        output = tmp_path / 'placeholder.mp3'
+        output.write_bytes(b'\x07' * 10000)
+
+        assert TTSService().generate_audio_local_placeholder('kısa', str(output))
+        assert b'\x07' not in output.read_bytes()
+
+
+class TestGetTTSService:
+    """Test the lazily created shared instance"""
+
+    def test_singleton(self, no_keys):
+        get_tts_service.cache_clear()
+        try:
+            assert get_tts_service() is get_tts_service()
+        finally:
+            get_tts_service.cache_clear()
+
+    def test_legacy_module_attribute(self, no_keys):
+        get_tts_service.cache_clear()
+        try:
+            from tts_service import tts_service as legacy
+
+            assert legacy is get_tts_service()
+        finally:
+            get_tts_service.cache_clear()
+
+    def test_unknown_module_attribute(self):
+        with pytest.raises(AttributeError):
+            tts_service.does_not_exist
@@ -10,15 +10,29 @@ Not: ElevenLabs ve Replicate API anahtarları .env üzerinden alınır.
 
 from __future__ import annotations
 
+import functools
 import os
 import logging
+import random
 import time
-from typing import Optional
+from typing import Callable, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+# (connect, read) timeout'ları (saniye): erişilemeyen bir sağlayıcı 30 sn beklemeden
+# birkaç saniyede düşer ve sıradaki sağlayıcıya geçilir
+HTTP_TIMEOUT = (3.0, 30.0)
+REPLICATE_POLL_HTTP_TIMEOUT = (3.0, 10.0)
+
+# Replicate tahmin durumu sorgulama (saniye)
+REPLICATE_POLL_INITIAL_DELAY = 0.25
+REPLICATE_POLL_MAX_DELAY = 4.0
+REPLICATE_POLL_TIMEOUT = 60.0
+
 
 class TTSService:
     """
@@ -34,6 +48,55 @@ class TTSService:
         self.elevenlabs_api_key: Optional[str] = os.getenv("ELEVENLABS_API_KEY")
         self.replicate_api_key: Optional[str] = os.getenv("REPLICATE_API_KEY")
 
+        # Ortak bağlantı havuzu: keep-alive ile her çağrıda yeni TLS el sıkışması yapılmaz
+        # (Replicate polling döngüsünde özellikle önemli).
+        self._session = requests.Session()
+        # Yalnızca güvenli tekrarlar: bağlantı kurulamazsa (istek sunucuya hiç ulaşmamıştır)
+        # en fazla 2 kez; 502/503/504 ise sadece GET'te (durum sorgusu, ses indirme).
+        # Okuma timeout'u tekrarlanmaz: asılı bir uç 3× read timeout bekletmesin ve
+        # ücretli POST'lar (ElevenLabs sentezi, Replicate tahmini) iki kez gönderilmesin.
+        retry = Retry(
+            total=2,
+            connect=2,
+            read=0,
+            status=2,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,  # son deneme de 5xx ise yanıtı çağırana bırak
+        )
+        self._session.mount(
+            "https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+        )
+
+        # Çağrılar arasında değişmeyen header/gövde parçaları bir kez kurulur
+        self._eleven_headers = {
+            "Accept": "audio/mpeg",
+            "Content-Type": "application/json",
+            "xi-api-key": self.elevenlabs_api_key or "",
+        }
+        self._eleven_body_tmpl = {
+            "model_id": "eleven_monolingual_v1",
+            "voice_settings": {"stability": 0.5, "similarity_boost": 0.5},
+        }
+        self._replicate_headers = {
+            "Authorization": f"Token {self.replicate_api_key}",
+            "Content-Type": "application/json",
+        }
+        self._replicate_input_tmpl = {
+            "speaker": "Ana",  # Türkçe kadın sesi
+            "language": "tr",
+            "cleanup_voice": True,
+        }
+
+        # Anahtarı olmayan sağlayıcılar listeye hiç eklenmez; router her istekte
+        # devre dışı sağlayıcıları çağırıp atlamakla uğraşmaz.
+        self._providers: list[tuple[str, Callable[[str, str], bool]]] = []
+        if self.elevenlabs_api_key:
+            self._providers.append(("ElevenLabs", self.generate_audio_elevenlabs))
+        if self.replicate_api_key:
+            self._providers.append(("Replicate Coqui XTTS", self.generate_audio_replicate))
+
     # ------------------------------------------------------------------ #
     # ElevenLabs
     # ------------------------------------------------------------------ #
@@ -57,25 +120,17 @@ class TTSService:
 
         try:
             url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": self.elevenlabs_api_key,
-            }
-            data = {
-                "text": text,
-                "model_id": "eleven_monolingual_v1",
-                "voice_settings": {"stability": 0.5, "similarity_boost": 0.5},
-            }
+            data = {**self._eleven_body_tmpl, "text": text}
 
-            resp = requests.post(url, json=data, headers=headers, timeout=30)
-            if resp.status_code == 200:
-                with open(output_path, "wb") as f:
-                    f.write(resp.content)
-                return True
+            with self._session.post(
+                url, json=data, headers=self._eleven_headers, timeout=HTTP_TIMEOUT, stream=True
+            ) as resp:
+                if resp.status_code == 200:
+                    self._save_stream(resp, output_path)
+                    return True
 
-            logger.error("ElevenLabs API error: %s %s", resp.status_code, resp.text)
-            return False
+                logger.error("ElevenLabs API error: %s %s", resp.status_code, resp.text)
+                return False
         except Exception as exc:
             logger.error("ElevenLabs TTS error: %s", exc)
             return False
@@ -99,25 +154,17 @@ class TTSService:
             return False
 
         try:
-            headers = {
-                "Authorization": f"Token {self.replicate_api_key}",
-                "Content-Type": "application/json",
-            }
+            headers = self._replicate_headers
             data = {
                 "version": "cjwbw/xtts-v2:5e7e2b2c6c2e1db3a1e9e5c1c6f4b5e1b5e1b5e1",
-                "input": {
-                    "text": text,
-                    "speaker": "Ana",  # Türkçe kadın sesi
-                    "language": "tr",
-                    "cleanup_voice": True,
-                },
+                "input": {"text": text, **self._replicate_input_tmpl},
             }
 
-            resp = requests.post(
+            resp = self._session.post(
                 "https://api.replicate.com/v1/predictions",
                 headers=headers,
                 json=data,
-                timeout=30,
+                timeout=HTTP_TIMEOUT,
             )
             if resp.status_code != 201:
                 logger.error("Replicate API error: %s %s", resp.status_code, resp.text)
@@ -126,14 +173,19 @@ class TTSService:
             prediction = resp.json()
             prediction_id = prediction["id"]
 
-            # Tamamlanana kadar bekle
-            for _ in range(30):
-                status_resp = requests.get(
+            # Tamamlanana kadar bekle: üstel backoff (0.25, 0.5, 1, 2, 4, 4, ... sn)
+            delay = REPLICATE_POLL_INITIAL_DELAY
+            deadline = time.monotonic() + REPLICATE_POLL_TIMEOUT
+            while time.monotonic() < deadline:
+                status_resp = self._session.get(
                     f"https://api.replicate.com/v1/predictions/{prediction_id}",
                     headers=headers,
-                    timeout=10,
+                    timeout=REPLICATE_POLL_HTTP_TIMEOUT,
                 )
                 if status_resp.status_code != 200:
+                    # Geçici hata: aynı anda yeniden denemeyi önlemek için jitter ekle
+                    time.sleep(delay * random.uniform(1.0, 1.5))
+                    delay = min(delay * 2, REPLICATE_POLL_MAX_DELAY)
                     continue
 
                 status = status_resp.json()
@@ -143,17 +195,19 @@ class TTSService:
                         logger.error("Replicate: çıktı URL'si bulunamadı")
                         return False
 
-                    audio_resp = requests.get(audio_url, timeout=30)
-                    if audio_resp.status_code == 200:
-                        with open(output_path, "wb") as f:
-                            f.write(audio_resp.content)
-                        return True
-                    return False
+                    with self._session.get(
+                        audio_url, timeout=HTTP_TIMEOUT, stream=True
+                    ) as audio_resp:
+                        if audio_resp.status_code == 200:
+                            self._save_stream(audio_resp, output_path)
+                            return True
+                        return False
                 if status.get("status") == "failed":
                     logger.error("Replicate tahmin başarısız")
                     return False
 
-                time.sleep(1)
+                time.sleep(delay)
+                delay = min(delay * 2, REPLICATE_POLL_MAX_DELAY)
 
             logger.error("Replicate prediction timeout")
             return False
@@ -177,14 +231,21 @@ class TTSService:
             bool: True = başarılı, False = başarısız
         """
         try:
-            placeholder = (
+            payload = (
                 f"# Audio Placeholder\n"
                 f"# Text: {text}\n"
                 f"# Path: {os.path.basename(output_path)}\n"
                 f"# Burada normalde gerçek ses dosyası olurdu.\n"
-            )
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(placeholder)
+            ).encode("utf-8")
+
+            # Tek seferlik küçük yazım: Python metin/buffer katmanı olmadan doğrudan fd'ye
+            fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                view = memoryview(payload)
+                while view:
+                    view = view[os.write(fd, view):]
+            finally:
+                os.close(fd)
 
             logger.info("Placeholder audio file created: %s", output_path)
             return True
@@ -192,6 +253,19 @@ class TTSService:
             logger.error("Error creating placeholder audio: %s", exc)
             return False
 
+    # ------------------------------------------------------------------ #
+    # Yardımcılar
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _save_stream(resp: requests.Response, output_path: str) -> None:
+        """
+        Yanıt gövdesini 64 KB'lık parçalarla diske yazar.
+        Tüm ses dosyası bellekte tutulmaz; ağdan okuma ve disk yazımı iç içe ilerler.
+        """
+        with open(output_path, "wb", buffering=1 << 20) as f:
+            for chunk in resp.iter_content(chunk_size=1 << 16):
+                f.write(chunk)
+
     # ------------------------------------------------------------------ #
     # Router
     # ------------------------------------------------------------------ #
@@ -206,17 +280,26 @@ class TTSService:
             text: Seslendirilecek metin
             output_path: Çıktı dosyası yolu
         """
-        if self.generate_audio_elevenlabs(text, output_path):
-            logger.info("Audio generated using ElevenLabs")
-            return True
-
-        if self.generate_audio_replicate(text, output_path):
-            logger.info("Audio generated using Replicate Coqui XTTS")
-            return True
+        for name, provider in self._providers:
+            if provider(text, output_path):
+                logger.info("Audio generated using %s", name)
+                return True
 
         logger.info("Falling back to placeholder TTS")
         return self.generate_audio_local_placeholder(text, output_path)
 
 
-# Global TTS service instance
-tts_service = TTSService()
+@functools.cache
+def get_tts_service() -> TTSService:
+    """
+    Paylaşılan TTSService örneğini döner; ilk çağrıda oluşturulur.
+    Modülü import etmek (ör. test toplama sırasında) session/adapter kurmaz.
+    """
+    return TTSService()
+
+
+def __getattr__(name: str) -> TTSService:
+    """Eski `from tts_service import tts_service` kullanımı için geriye dönük uyumluluk."""
+    if name == "tts_service":
+        return get_tts_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")